@@ -3,6 +3,7 @@ import time
 import pandas as pd
 import re
 import os
+import uuid
 from datetime import datetime, timedelta
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -214,6 +215,86 @@ def extract_price_estimate(text):
     except:
         return "-"
 
+def parse_price_value(price_str):
+    # extract_price_estimate の表示文字列 ("€ 12.50" / "-") を数値へ。不明は NaN
+    try:
+        return float(price_str.replace("€", "").strip())
+    except:
+        return float("nan")
+
+# ---------------------------------------------------------
+# 検索結果 (列指向で保持 + ページ単位で表示)
+# ---------------------------------------------------------
+FOUND_PAGE_SIZE = 20
+FOUND_SORT_OPTS = {"日付": "date", "施設名": "facility", "金額": "price_value"}
+FOUND_VIEW_KEYS = ["found_filter_dates", "found_filter_facilities", "found_filter_price",
+                   "found_filter_price_unknown", "found_sort_label", "found_sort_desc", "found_page"]
+
+def build_found_frame(rows):
+    """検索結果の dict リストを型付きの列指向 DataFrame に変換 (表示用の列もここで一度だけ作る)"""
+    if not rows:
+        return pd.DataFrame()
+    df = pd.DataFrame(rows)
+    return pd.DataFrame({
+        "date": pd.to_datetime(df["date_obj"]),
+        "date_label": pd.Categorical(df["date_obj"].map(get_japanese_date_str)),
+        "facility": pd.Categorical(df["facility"]),
+        "raw_facility": pd.Categorical(df["raw_facility"]),
+        "price": pd.Series([r["price"] for r in rows], dtype=object),
+        "price_value": df["price"].map(parse_price_value).astype("float64"),
+        "part_id": pd.Categorical(df["part_id"]),
+        "url": pd.Series([r["url"] for r in rows], dtype=object),
+    })
+
+def found_row_to_slot(row):
+    """予約処理に渡す 1 件分の dict を DataFrame の行から復元"""
+    return {
+        "display": f"{row['date_label']} {row['raw_facility']}",
+        "date_obj": row["date"].date(),
+        "facility": row["facility"],
+        "raw_facility": row["raw_facility"],
+        "price": row["price"],
+        "part_id": row["part_id"],
+        "url": row["url"],
+    }
+
+def reset_found_view_state():
+    """新しい検索結果に切り替える際、選択・絞り込み・ページ位置を初期化"""
+    st.session_state.found_selected = set()
+    for k in FOUND_VIEW_KEYS:
+        st.session_state.pop(k, None)
+
+def clear_found_selection():
+    """全ページの選択を解除 (editor の key も変え、表示中ページのチェック状態も捨てる)"""
+    st.session_state.found_selected = set()
+    st.session_state.found_editor_nonce += 1
+
+def reset_found_page():
+    st.session_state.found_page = 1
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_found_page(version, _found_df, dates, facilities, price_range, include_unknown_price,
+                     sort_col, descending, page, page_size):
+    """絞り込み・並び替え後、表示中の 1 ページ分だけを返す (version が変わるまでメモ化)"""
+    view = _found_df
+    if dates:
+        view = view[view["date_label"].isin(dates)]
+    if facilities:
+        view = view[view["facility"].isin(facilities)]
+    # 金額不明 (NaN) は金額範囲とは独立に include_unknown_price で扱う
+    keep = view["price_value"].notna()
+    if price_range is not None:
+        keep = view["price_value"].between(*price_range)
+    if include_unknown_price:
+        keep |= view["price_value"].isna()
+    view = view[keep]
+    view = view.sort_values(sort_col, ascending=not descending, kind="stable", na_position="last")
+
+    start = (page - 1) * page_size
+    page_df = view.iloc[start:start + page_size][["date_label", "facility", "price"]]
+    page_df = page_df.astype({"date_label": "string", "facility": "string"})
+    return page_df.rename(columns={"date_label": "日付", "facility": "施設名", "price": "金額(2h)"}), len(view)
+
 # ---------------------------------------------------------
 # コールバック関数 (日付追加)
 # ---------------------------------------------------------
@@ -436,7 +517,10 @@ if (not is_locked) and password == TEAM_PASSWORD:
     # モード選択UIは非表示化 (他モードの分岐ロジックは下に残っているが到達しない)
     mode = "5"
 
-    if 'found_slots' not in st.session_state: st.session_state.found_slots = [] 
+    if 'found_df' not in st.session_state: st.session_state.found_df = pd.DataFrame()
+    if 'found_version' not in st.session_state: st.session_state.found_version = ""
+    if 'found_selected' not in st.session_state: st.session_state.found_selected = set()
+    if 'found_editor_nonce' not in st.session_state: st.session_state.found_editor_nonce = 0
     if 'manual_targets' not in st.session_state: st.session_state.manual_targets = []
 
     # --- 日付追加エリア ---
@@ -509,7 +593,7 @@ if (not is_locked) and password == TEAM_PASSWORD:
                     if d.weekday() in r['ws']: targets.append({"date": d, "part": r['part']})
 
         if valid:
-            st.session_state.found_slots = []
+            found_rows = []
             status = st.empty()
             prog = st.progress(0)
             driver = None
@@ -539,15 +623,13 @@ if (not is_locked) and password == TEAM_PASSWORD:
                                         display_name = "🔶 " + txt_name 
 
                                 if (mode in ["1","2","3"] and is_deel) or (mode in ["4", "5"]):
-                                    st.session_state.found_slots.append({
-                                        "display": f"{jp_date} {txt_name}",
+                                    found_rows.append({
                                         "date_obj": t['date'],
                                         "facility": display_name, 
                                         "raw_facility": txt_name,
                                         "price": price_est,
                                         "part_id": t['part'],
                                         "url": link,
-                                        "予約する": False 
                                     })
                             except: continue
                 
@@ -555,40 +637,114 @@ if (not is_locked) and password == TEAM_PASSWORD:
                 time.sleep(0.5)
                 status.empty()
                 prog.empty()
-                if not st.session_state.found_slots: st.warning("条件に合う空きは見つかりませんでした")
+                if not found_rows: st.warning("条件に合う空きは見つかりませんでした")
             
             except Exception as e:
                 st.error(f"システムエラー: {e}")
             finally:
                 if driver: driver.quit()
+                # 結果は検索ごとに一度だけ列指向へ変換し、version で表示キャッシュを切り替える
+                st.session_state.found_df = build_found_frame(found_rows)
+                st.session_state.found_version = uuid.uuid4().hex
+                reset_found_view_state()
 
     # --- 結果一覧 & 予約実行 ---
-    if st.session_state.found_slots:
-        st.markdown(f"#### ✨ 空き発見: {len(st.session_state.found_slots)} 件")
+    found_df = st.session_state.found_df
+    if not found_df.empty:
+        st.markdown(f"#### ✨ 空き発見: {len(found_df)} 件")
         st.caption("予約したい枠にチェックを入れてください")
-        
-        df_found = pd.DataFrame(st.session_state.found_slots)
-        df_found["日付"] = df_found["date_obj"].apply(get_japanese_date_str)
-        df_found_disp = df_found[["予約する", "日付", "facility", "price"]].rename(columns={"facility": "施設名", "price": "金額(2h)"})
-
-        edited_found_df = st.data_editor(
-            df_found_disp,
-            hide_index=True,
-            use_container_width=True,
-            column_config={
-                "予約する": st.column_config.CheckboxColumn(label="選択", width="small", default=False),
-                "施設名": st.column_config.TextColumn(width="medium"),
-                "金額(2h)": st.column_config.TextColumn(width="small"),
-            }
+
+        # 絞り込み・並び替え (サーバ側で処理し、ブラウザには表示中のページだけ送る)
+        with st.expander("🔎 絞り込み・並び替え"):
+            st.multiselect("日付", list(found_df["date_label"].cat.categories),
+                           key="found_filter_dates", on_change=reset_found_page)
+            st.multiselect("施設名", list(found_df["facility"].cat.categories),
+                           key="found_filter_facilities", on_change=reset_found_page)
+            price_min, price_max = found_df["price_value"].min(), found_df["price_value"].max()
+            if pd.notna(price_min) and price_min < price_max:
+                st.slider("金額(2h)", float(price_min), float(price_max), (float(price_min), float(price_max)),
+                          key="found_filter_price", on_change=reset_found_page)
+            if found_df["price_value"].isna().any():
+                st.checkbox("金額不明を含める", value=True,
+                            key="found_filter_price_unknown", on_change=reset_found_page)
+            c_sort1, c_sort2 = st.columns([2, 1])
+            with c_sort1:
+                st.selectbox("並び替え", list(FOUND_SORT_OPTS.keys()), key="found_sort_label", on_change=reset_found_page)
+            with c_sort2:
+                st.checkbox("降順", key="found_sort_desc", on_change=reset_found_page)
+
+        filter_dates = tuple(st.session_state.get("found_filter_dates", []))
+        filter_facilities = tuple(st.session_state.get("found_filter_facilities", []))
+        filter_price = st.session_state.get("found_filter_price")
+        include_unknown_price = st.session_state.get("found_filter_price_unknown", True)
+        view_args = (
+            filter_dates,
+            filter_facilities,
+            filter_price,
+            include_unknown_price,
+            FOUND_SORT_OPTS[st.session_state.get("found_sort_label", "日付")],
+            st.session_state.get("found_sort_desc", False),
         )
-        
-        selected_indices = edited_found_df[edited_found_df["予約する"] == True].index
-        selected_slots = [st.session_state.found_slots[i] for i in selected_indices]
+        page = st.session_state.get("found_page", 1)
+        page_df, total = build_found_page(st.session_state.found_version, found_df, *view_args, page, FOUND_PAGE_SIZE)
+
+        # 1 ページに収まるとページ欄が出ないため、絞り込み中は件数をここで示す
+        filter_active = (
+            bool(filter_dates or filter_facilities) or not include_unknown_price
+            or filter_price not in (None, (float(price_min), float(price_max)))
+        )
+        if filter_active:
+            st.caption(f"絞り込み結果: {total} / {len(found_df)} 件")
+
+        if total == 0:
+            st.info("条件に合う枠がありません")
+        else:
+            # チェック列は editor の key ごとに一度だけ作る。同じ key の間は入力データを固定し、
+            # クリックは editor 自身の編集状態に任せる (入力が変わると古い Streamlit では
+            # widget id が変わり、次のクリックが失われるため)
+            editor_key = f"found_editor_{st.session_state.found_version}_{st.session_state.found_editor_nonce}_{hash(view_args + (page,))}"
+            seed_key, seed_checks = st.session_state.get("found_editor_seed", (None, None))
+            if seed_key != editor_key:
+                seed_checks = page_df.index.isin(st.session_state.found_selected)
+                st.session_state.found_editor_seed = (editor_key, seed_checks)
+            page_df.insert(0, "予約する", seed_checks)
+            edited_found_df = st.data_editor(
+                page_df,
+                key=editor_key,
+                hide_index=True,
+                use_container_width=True,
+                disabled=["日付", "施設名", "金額(2h)"],
+                column_config={
+                    "予約する": st.column_config.CheckboxColumn(label="選択", width="small", default=False),
+                    "施設名": st.column_config.TextColumn(width="medium"),
+                    "金額(2h)": st.column_config.TextColumn(width="small"),
+                }
+            )
+
+            # 表示中ページのチェック状態だけを選択集合へ反映 (他ページ・非表示の選択は保持)
+            for row_id, checked in edited_found_df["予約する"].items():
+                if checked:
+                    st.session_state.found_selected.add(row_id)
+                else:
+                    st.session_state.found_selected.discard(row_id)
+
+            total_pages = (total + FOUND_PAGE_SIZE - 1) // FOUND_PAGE_SIZE
+            if total_pages > 1:
+                st.number_input(f"ページ (全 {total_pages} ページ / {total} 件)",
+                                min_value=1, max_value=total_pages, step=1, key="found_page")
+
+        selected_ids = sorted(st.session_state.found_selected)
+        selected_slots = [found_row_to_slot(row) for _, row in found_df.loc[selected_ids].iterrows()]
         
         if selected_slots:
             st.markdown("---")
             st.markdown("#### 🔐 予約実行")
 
+            # 他ページや絞り込みで非表示の枠も含め、予約対象をすべて表示する
+            st.markdown(f"**予約対象: {len(selected_slots)} 件**")
+            st.markdown("\n".join(f"- {slot['display']} ({slot['price']})" for slot in selected_slots))
+            st.button("✖️ 選択解除", on_click=clear_found_selection, use_container_width=True)
+
             # 予約者の選択 (表示は名前のみ。プロフィールの中身はUI/ログに出さない)
             st.selectbox("👤 予約者を選択", options=list(USER_PROFILES.keys()), key="selected_booker")
             st.caption(f"この内容で {st.session_state.selected_booker} さんとして予約します")